@@ -1,6 +1,11 @@
 from game.board import Board
+from game.time_control import Clock
 
 class BaseEngine():
+    # Optional cap on search depth, set while the analysis service is asking for a search to a given depth.
+    # Engines that search by depth should stop once they reach it; None means no cap.
+    max_depth: int | None = None
+
     def __init__(self) -> None:
         # Engine Name
         self.name = "Default Engine Name"
@@ -9,10 +14,37 @@ class BaseEngine():
         
         # Include any other metadata or variables you want in your init
 
+    # Lifecycle hooks; override whichever you need
+    # The same engine is reused for every game in a match, so expensive loading belongs in setup() rather than __init__
+    # When games run concurrently, each worker process gets a copy of the engine taken after setup(), so it only runs once
+    def setup(self) -> None:
+        """
+        Called once per match, before the first game. Load tables, opening books, weights, etc. here.
+        """
+        pass
+
+    def new_game(self, seed: int) -> None:
+        """
+        Called before every game. Reset any per-game state here.
+
+        Args:
+            seed (int): The game number. Use it as a random seed to keep games predictable but different from each other.
+        """
+        pass
+
+    def teardown(self) -> None:
+        """
+        Called once at the end of the match, on the engine and on each worker process's copy of it.
+        """
+        pass
+
     # Must be overridden with your algo
-    def best_move(self, board: Board, time_limit: float) -> tuple[tuple[int], dict]:
+    def best_move(self, board: Board, time_limit: Clock) -> tuple[tuple[int], dict]:
         """
         Finds the best move from the given board and returns it, along with an optional metadata dict
+
+        time_limit can be used as a float (the suggested time for this move), or read for the full clock:
+        remaining, opponent_remaining, increment and move_limit.
         """
         raise Exception(f"{self.name}: best_move() is not implemented!")
     
@@ -0,0 +1,216 @@
+from .engine_base import BaseEngine
+
+import asyncio
+import math
+import multiprocessing
+import time
+import traceback
+
+# How long past its time limit a worker gets before it's killed. Covers the time spent sending the move back.
+KILL_GRACE = 0.25
+# Time allowed for lifecycle calls (new_game, teardown)
+LIFECYCLE_TIMEOUT = 30
+
+# Workers aren't forked straight from the arbiter- forking a process that has threads running (asyncio.to_thread, web UI updates) can leave the child stuck on a lock one of them held
+_context = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+class EngineTimeout(Exception):
+    """
+    Raised when an engine doesn't reply within its time limit. The worker process has already been killed.
+    """
+    pass
+
+class EngineCrashed(Exception):
+    """
+    Raised when an engine errors out inside its worker. The message holds the worker's traceback.
+    """
+    pass
+
+def _worker_main(engine: BaseEngine, conn) -> None:
+    """
+    (internal use) Entry point of a worker process. Runs engine methods as the parent asks for them until told to tear down.
+    """
+    while True:
+        try:
+            method, args = conn.recv()
+        except (EOFError, OSError, KeyboardInterrupt):
+            return
+
+        try:
+            if method == 'best_move':
+                board, time_limit, max_depth = args
+                previous_depth = engine.max_depth
+                if max_depth is not None:
+                    engine.max_depth = max_depth
+                # Timed in here so sending the board over isn't counted against the engine
+                try:
+                    start = time.time()
+                    move = engine.best_move(board, time_limit)
+                    reply = (True, (move, time.time() - start))
+                finally:
+                    engine.max_depth = previous_depth
+            else:
+                reply = (True, getattr(engine, method)(*args))
+        except Exception:
+            reply = (False, traceback.format_exc())
+
+        try:
+            conn.send(reply)
+        except Exception:
+            # e.g. the engine returned something that can't be pickled
+            conn.send((False, traceback.format_exc()))
+
+        if method == 'teardown':
+            return
+
+class EngineWorker():
+    """
+    Runs an engine in its own process. The engine keeps its state between moves and games, and the process is killed if the engine goes over its time limit.
+    """
+    __slots__ = ("engine", "name", "player", "process", "conn")
+    def __init__(self, engine: BaseEngine) -> None:
+        """
+        Set up a worker. The process isn't started until the first call, and is restarted from engine if it ever gets killed.
+
+        Args:
+            engine (BaseEngine): The engine to run. The worker gets its own copy, taken after any setup() the engine has already done.
+
+        Examples:
+            >>> EngineWorker(SampleEngine(0)).best_move(Board(), clock, timeout=100)
+            Output: The engine's move and metadata, and how long it took.
+        """
+        self.engine = engine
+        self.name = engine.name
+        self.player = engine.player
+        self.process = None
+        self.conn = None
+
+    def alive(self) -> bool:
+        """
+        Whether the worker process is running.
+        """
+        return self.process is not None and self.process.is_alive()
+
+    def start(self) -> None:
+        """
+        Starts a fresh worker process, killing the old one if there is one.
+        """
+        self.close()
+        parent_conn, child_conn = _context.Pipe()
+        self.process = _context.Process(target=_worker_main, args=(self.engine, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+    def close(self) -> None:
+        """
+        Kills the worker process without tearing the engine down.
+        """
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+            self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def _send(self, method: str, args: tuple) -> None:
+        if not self.alive():
+            self.start()
+        self.conn.send((method, args))
+
+    def _receive(self):
+        try:
+            ok, result = self.conn.recv()
+        except (EOFError, OSError):
+            self.close()
+            raise EngineCrashed(f"{self.name}: worker process exited unexpectedly")
+        if not ok:
+            raise EngineCrashed(result)
+        return result
+
+    def _timed_out(self):
+        self.close()
+        return EngineTimeout(f"{self.name}: no reply within the time limit")
+
+    @staticmethod
+    def _deadline(timeout: float | None) -> float | None:
+        if timeout is None or math.isinf(timeout):
+            return None
+        return timeout + KILL_GRACE
+
+    def call(self, method: str, *args, timeout: float | None = None):
+        """
+        Calls a method on the worker's engine and waits for the result.
+
+        Args:
+            method (str): The engine method to call.
+            timeout (float | None, optional): How long the engine has. If it takes longer, the worker is killed and EngineTimeout is raised.
+
+        Returns:
+            type: Whatever the method returned. For best_move, a tuple of its result and the time it took.
+        """
+        self._send(method, args)
+        if not self.conn.poll(self._deadline(timeout)):
+            raise self._timed_out()
+        return self._receive()
+
+    async def call_async(self, method: str, *args, timeout: float | None = None):
+        """
+        Asyncio version of call(). Doesn't tie up a thread while the engine thinks.
+        """
+        loop = asyncio.get_running_loop()
+        self._send(method, args)
+
+        # Woken by the event loop as soon as the reply (or the worker's death) makes the pipe readable
+        replied = loop.create_future()
+        fd = self.conn.fileno()
+        loop.add_reader(fd, lambda: replied.done() or replied.set_result(None))
+        try:
+            await asyncio.wait_for(replied, self._deadline(timeout))
+        except asyncio.TimeoutError:
+            loop.remove_reader(fd)
+            raise self._timed_out()
+        except BaseException:
+            # Cancelled- the reply would be read as the answer to the next call, so the worker has to go
+            loop.remove_reader(fd)
+            self.close()
+            raise
+        loop.remove_reader(fd)
+        return self._receive()
+
+    def best_move(self, board, time_limit, timeout: float | None = None, max_depth: int | None = None) -> tuple[tuple[tuple[int], dict], float]:
+        """
+        Runs the engine's best_move(). Returns its result and how long it took.
+
+        Args:
+            max_depth (int | None, optional): If given, the engine's max_depth is set to this for the duration of the call.
+        """
+        return self.call('best_move', board, time_limit, max_depth, timeout=timeout)
+
+    async def best_move_async(self, board, time_limit, timeout: float | None = None, max_depth: int | None = None) -> tuple[tuple[tuple[int], dict], float]:
+        """
+        Asyncio version of best_move().
+        """
+        return await self.call_async('best_move', board, time_limit, max_depth, timeout=timeout)
+
+    def stop(self) -> None:
+        """
+        Tears down the worker's engine and shuts the process down.
+        """
+        if self.alive():
+            try:
+                self.call('teardown', timeout=LIFECYCLE_TIMEOUT)
+            except (EngineTimeout, EngineCrashed):
+                pass
+        self.close()
+
+    async def stop_async(self) -> None:
+        """
+        Asyncio version of stop().
+        """
+        if self.alive():
+            try:
+                await self.call_async('teardown', timeout=LIFECYCLE_TIMEOUT)
+            except (EngineTimeout, EngineCrashed):
+                pass
+        self.close()
@@ -0,0 +1,244 @@
+# Unit tests for engine worker processes, and for how the arbiter scores engines that crash or run out of time
+# Should NEVER be imported- run it from the repo root with: python -m engines.engine_worker_tests
+
+from game.board import Board
+from game.time_control import TimeControl
+from engines.engine_base import BaseEngine
+from engines.engine_worker import EngineCrashed, EngineTimeout, EngineWorker, KILL_GRACE
+from engines.sample import SampleEngine
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import types
+import unittest
+
+# match.py plays against the tournament's secret engine, which isn't part of the repo
+try:
+    import engines.secret
+except ImportError:
+    secret = types.ModuleType("engines.secret")
+    secret.SecretEngine = SampleEngine
+    sys.modules["engines.secret"] = secret
+import match
+
+class StubEngine(BaseEngine):
+    def __init__(self) -> None:
+        self.name = "Stub Engine"
+        self.player = "Nobody"
+        self.moves = 0
+
+    def best_move(self, board, time_limit):
+        self.moves += 1
+        return next(board.get_legal_moves()), {'moves': self.moves, 'depth': self.max_depth}
+
+class HangingEngine(StubEngine):
+    def best_move(self, board, time_limit):
+        while True:
+            time.sleep(1)
+
+class SlowEngine(StubEngine):
+    def best_move(self, board, time_limit):
+        time.sleep(0.4)
+        return super().best_move(board, time_limit)
+
+class CrashingEngine(StubEngine):
+    def best_move(self, board, time_limit):
+        raise RuntimeError("engine blew up")
+
+class RecordingEngine(StubEngine):
+    """
+    Logs every lifecycle call to a file, along with the process it was made in, so calls made in worker processes are seen too.
+    """
+    log_path = None
+    def __init__(self, *args) -> None:
+        super().__init__()
+        self.name = type(self).__name__
+        # Kept on the instance so worker copies log to the same file
+        self.log_path = RecordingEngine.log_path
+
+    def _record(self, *event) -> None:
+        with open(self.log_path, "a") as log:
+            log.write(" ".join(str(part) for part in (self.name, os.getpid()) + event) + "\n")
+
+    def setup(self) -> None:
+        self._record("setup")
+
+    def new_game(self, seed: int) -> None:
+        self._record("new_game", seed)
+
+    def teardown(self) -> None:
+        self._record("teardown")
+
+class OtherRecordingEngine(RecordingEngine):
+    pass
+
+# Short enough to keep the tests quick, long enough for a stub to reply in
+CONTROL = TimeControl.per_move(0.2, 0.3)
+
+def clock():
+    return CONTROL.new_game().clock(0)
+
+class TestEngineWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.workers = []
+
+    def tearDown(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def worker(self, engine):
+        worker = EngineWorker(engine)
+        self.workers.append(worker)
+        # Started here, so process startup isn't counted against the engine in timing checks
+        worker.call('new_game', 0, timeout=30)
+        return worker
+
+    def test_keeps_state_between_calls(self):
+        worker = self.worker(StubEngine())
+        for moves in range(1, 3):
+            (move, meta), time_taken = worker.best_move(Board(), clock(), timeout=5)
+            self.assertEqual(meta['moves'], moves)
+            self.assertTrue(Board().is_move_legal(move))
+
+    def test_max_depth(self):
+        worker = self.worker(StubEngine())
+        (_, meta), _ = worker.best_move(Board(), clock(), timeout=5, max_depth=3)
+        self.assertEqual(meta['depth'], 3)
+        # Only set for that one call
+        (_, meta), _ = worker.best_move(Board(), clock(), timeout=5)
+        self.assertIsNone(meta['depth'])
+
+    def test_timeout_kills_worker(self):
+        worker = self.worker(HangingEngine())
+        pid = worker.process.pid
+        start = time.time()
+        with self.assertRaises(EngineTimeout):
+            worker.best_move(Board(), clock(), timeout=0.3)
+        self.assertLess(time.time() - start, 0.3 + KILL_GRACE + 0.25)
+        self.assertFalse(worker.alive())
+
+        # Restarted from the engine on the next call
+        self.assertIsNone(worker.call('new_game', 1, timeout=30))
+        self.assertNotEqual(worker.process.pid, pid)
+
+    def test_timeout_kills_worker_async(self):
+        worker = self.worker(HangingEngine())
+
+        async def run():
+            for _ in range(2):
+                start = time.time()
+                with self.assertRaises(EngineTimeout):
+                    await worker.best_move_async(Board(), clock(), timeout=0.3)
+                self.assertLess(time.time() - start, 0.3 + KILL_GRACE + 0.25)
+                self.assertFalse(worker.alive())
+                self.assertIsNone(await worker.call_async('new_game', 1, timeout=30))
+        asyncio.run(run())
+
+    def test_cancelled_call_kills_worker(self):
+        worker = self.worker(HangingEngine())
+
+        async def run():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(worker.best_move_async(Board(), clock()), 0.2)
+        asyncio.run(run())
+        # Its reply would otherwise be mistaken for the answer to the next call
+        self.assertFalse(worker.alive())
+
+    def test_crash(self):
+        worker = self.worker(CrashingEngine())
+        with self.assertRaises(EngineCrashed) as raised:
+            worker.best_move(Board(), clock(), timeout=5)
+        self.assertIn("engine blew up", str(raised.exception))
+        # The engine raising doesn't take the worker down with it
+        self.assertTrue(worker.alive())
+        self.assertIsNone(worker.call('new_game', 1, timeout=30))
+
+class TestForfeits(unittest.TestCase):
+
+    def play_async(self, p1, p2):
+        return asyncio.run(match.run_game_async(p1, p2, update_site=False, time_control=CONTROL))
+
+    def play(self, p1, p2):
+        return match.run_game(p1, p2, update_site=False, time_control=CONTROL)
+
+    def test_crash_async(self):
+        self.assertEqual(self.play_async(CrashingEngine(), StubEngine()), -1)
+        self.assertEqual(self.play_async(StubEngine(), CrashingEngine()), 1)
+
+    def test_overrun_async(self):
+        for p1, p2, result in ((HangingEngine(), StubEngine(), -1), (StubEngine(), HangingEngine(), 1)):
+            start = time.time()
+            self.assertEqual(self.play_async(p1, p2), result)
+            # Killed at the hard limit, not left to hang the game
+            self.assertLess(time.time() - start, 5)
+
+    def test_crash(self):
+        self.assertEqual(self.play(CrashingEngine(), StubEngine()), -1)
+        self.assertEqual(self.play(StubEngine(), CrashingEngine()), 1)
+
+    def test_overrun(self):
+        self.assertEqual(self.play(SlowEngine(), StubEngine()), -1)
+        self.assertEqual(self.play(StubEngine(), SlowEngine()), 1)
+
+class TestLifecycle(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        RecordingEngine.log_path = os.path.join(directory.name, "lifecycle.log")
+        open(RecordingEngine.log_path, "w").close()
+
+    def events(self):
+        with open(RecordingEngine.log_path) as log:
+            return [line.split() for line in log.read().splitlines()]
+
+    def test_match(self):
+        players = (match.Player1, match.Player2)
+        match.Player1, match.Player2 = RecordingEngine, OtherRecordingEngine
+        match._engines.clear()
+        match._engine_names.clear()
+        try:
+            p1, p2 = match.match_engine(1), match.match_engine(2)
+            self.assertIs(match.match_engine(1), p1)
+            games = [(p1, p2, n) if n % 2 == 1 else (p2, p1, n) for n in range(1, 7)]
+            results = asyncio.run(match.run_games_async(games, update_site=False, concurrency=2))
+            self.assertEqual(len(results), 6)
+            match.teardown_engines()
+        finally:
+            match.Player1, match.Player2 = players
+            match._engines.clear()
+            match._engine_names.clear()
+
+        arbiter = str(os.getpid())
+        for name in ("RecordingEngine", "OtherRecordingEngine"):
+            events = [event[1:] for event in self.events() if event[0] == name]
+            # Once per match, before any copies are made
+            self.assertEqual([pid for pid, call, *_ in events if call == "setup"], [arbiter])
+            self.assertEqual(events[0][1], "setup")
+            # Once per game, with the game number as the seed
+            self.assertEqual(sorted(int(event[2]) for event in events if event[1] == "new_game"), list(range(1, 7)))
+            # Torn down in the arbiter and in every worker process that played
+            workers = {pid for pid, call, *_ in events if call == "new_game"}
+            self.assertNotIn(arbiter, workers)
+            teardowns = Counter(pid for pid, call, *_ in events if call == "teardown")
+            self.assertEqual(teardowns, Counter(workers | {arbiter}))
+
+    def test_executor(self):
+        # Threads share the engine objects, so every game gets its own
+        games = [(RecordingEngine(), OtherRecordingEngine(), n) for n in range(1, 5)]
+        with ThreadPoolExecutor(2) as executor:
+            asyncio.run(match.run_games_async(games, update_site=False, concurrency=2, executor=executor))
+        for name in ("RecordingEngine", "OtherRecordingEngine"):
+            seeds = [int(event[3]) for event in self.events() if event[0] == name and event[2] == "new_game"]
+            self.assertEqual(sorted(seeds), list(range(1, 5)))
+
+
+if __name__ == "__main__":
+    unittest.main()
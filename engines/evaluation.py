@@ -0,0 +1,189 @@
+from game.board import Board
+
+import numpy as np
+
+# Layout of the feature vector for a single position
+# [0, 81): squares held by X
+# [81, 162): squares held by O
+# [162, 198): macro board, 4 per sub-board (X won, O won, drawn, open)
+# [198, 208): current board one-hot, with the last slot meaning "any board"
+# [208]: side to move (0 for X, 1 for O)
+X_PLANE = 0
+O_PLANE = 81
+MACRO_PLANE = 162
+CURRENT_PLANE = 198
+TURN_FEATURE = 208
+N_FEATURES = 209
+
+# Which of the 4 macro board slots each sub-board state maps to
+_MACRO_SLOT = {1: 0, -1: 1, 0: 2, None: 3}
+
+# Typed scalars, so comparing against them doesn't make numpy allocate
+_X = np.int8(1)
+_O = np.int8(-1)
+
+def encode_board(board: Board, out: np.ndarray) -> np.ndarray:
+    """
+    Writes the feature vector for a board into an existing array.
+
+    Args:
+        board (Board): The position to encode.
+        out (np.ndarray): An array of N_FEATURES numbers to write into. Every feature is overwritten.
+
+    Returns:
+        type: out, for convenience.
+    """
+    np.equal(board.board, _X, out=out[X_PLANE:O_PLANE])
+    np.equal(board.board, _O, out=out[O_PLANE:MACRO_PLANE])
+    out[MACRO_PLANE:] = 0
+    _encode_state(board, out)
+    return out
+
+def _encode_state(board: Board, row: np.ndarray) -> None:
+    """
+    (internal use) Writes the macro board, current board and side to move into a feature row whose features from MACRO_PLANE on are already zeroed.
+    These only set a handful of features each, so they're written directly rather than built with numpy.
+    """
+    macro_board = board.macro_board
+    for i in range(9):
+        state = macro_board[i]
+        if state == 2:
+            # Not cached yet
+            state = board.subboard_winner(i)
+        row[MACRO_PLANE + (4 * i) + _MACRO_SLOT[state]] = 1
+    row[CURRENT_PLANE + (9 if board.current_board == -1 else board.current_board)] = 1
+    row[TURN_FEATURE] = board.move_count & 1
+
+def load_weights(path: str) -> list[tuple[np.ndarray, np.ndarray]]:
+    """
+    Loads model weights saved with save_weights().
+
+    Args:
+        path (str): Path to an .npz file with arrays W0, b0, W1, b1, ... for each layer.
+
+    Returns:
+        type: A list of (weights, bias) tuples, one per layer.
+    """
+    with np.load(path) as data:
+        layers = []
+        while f"W{len(layers)}" in data:
+            i = len(layers)
+            layers.append((data[f"W{i}"], data[f"b{i}"]))
+    if not layers:
+        raise ValueError(f"No layers found in {path}")
+    return layers
+
+def save_weights(path: str, layers: list[tuple[np.ndarray, np.ndarray]]) -> None:
+    """
+    Saves model weights in the format load_weights() reads.
+    """
+    arrays = {}
+    for i, (weights, bias) in enumerate(layers):
+        arrays[f"W{i}"] = weights
+        arrays[f"b{i}"] = bias
+    np.savez(path, **arrays)
+
+class Evaluator():
+    """
+    Scores positions in batches with a linear model or small MLP. A single layer is a linear model; with more layers, every layer but the last is followed by a ReLU.
+    Evaluations are from X's perspective- higher is better for X.
+    """
+    __slots__ = ("layers", "max_batch", "features", "activations", "biases", "cells", "x_mask", "o_mask")
+    def __init__(self, layers: list[tuple[np.ndarray, np.ndarray]], max_batch: int = 256) -> None:
+        """
+        Set up an evaluator. All buffers are allocated here, so scoring doesn't allocate any arrays.
+
+        Args:
+            layers (list): A list of (weights, bias) tuples. The first layer's weights must be (N_FEATURES, n), the last layer's must be (n, 1).
+            max_batch (int, optional): The most positions that can be scored in one call.
+
+        Examples:
+            >>> Evaluator.from_file("weights.npz")
+            Output: An evaluator using the weights in weights.npz
+        """
+        inputs = N_FEATURES
+        self.layers = []
+        for i, (weights, bias) in enumerate(layers):
+            weights = np.asarray(weights, np.float32)
+            bias = np.asarray(bias, np.float32).reshape(-1)
+            if weights.ndim != 2 or weights.shape[0] != inputs or bias.shape[0] != weights.shape[1]:
+                raise ValueError(f"Layer {i} has shape {weights.shape} with bias {bias.shape}, expected ({inputs}, n) with bias (n,)")
+            self.layers.append((weights, bias))
+            inputs = weights.shape[1]
+        if not self.layers or inputs != 1:
+            raise ValueError("The last layer must have a single output")
+
+        self.max_batch = max_batch
+        self.features = np.zeros((max_batch, N_FEATURES), np.float32)
+        self.activations = [np.zeros((max_batch, weights.shape[1]), np.float32) for weights, _ in self.layers]
+        # Biases repeated for every row. Adding a broadcast bias makes numpy allocate a buffer on every call, adding a same-shaped array doesn't.
+        self.biases = [np.tile(bias, (max_batch, 1)) for _, bias in self.layers]
+
+        # Every position's squares, so the occupancy planes can be built for the whole batch at once
+        self.cells = np.zeros((max_batch, 81), np.int8)
+        self.x_mask = np.zeros((max_batch, 81), np.bool_)
+        self.o_mask = np.zeros((max_batch, 81), np.bool_)
+
+    @staticmethod
+    def from_file(path: str, max_batch: int = 256) -> "Evaluator":
+        """
+        Makes an evaluator from a weights file saved with save_weights().
+        """
+        return Evaluator(load_weights(path), max_batch)
+
+    def evaluate(self, boards: list[Board]) -> np.ndarray:
+        """
+        Scores a batch of positions.
+
+        Args:
+            boards (list): The positions to score. At most max_batch of them.
+
+        Returns:
+            type: An array with the score of each position. This is a view into the evaluator's buffer, so copy it if you need it after the next call.
+        """
+        n = len(boards)
+        if n > self.max_batch:
+            raise ValueError(f"Batch of {n} positions is larger than max_batch ({self.max_batch})")
+
+        self._encode(boards)
+        return self._forward(n)
+
+    def evaluate_one(self, board: Board) -> float:
+        """
+        Scores a single position. Prefer evaluate() wherever positions can be batched.
+        """
+        self._encode((board,))
+        return float(self._forward(1)[0])
+
+    def _encode(self, boards: list[Board]) -> None:
+        """
+        (internal use) Fills the first len(boards) rows of the feature buffer. Same layout as encode_board(), with the occupancy planes built for the whole batch at once.
+        """
+        n = len(boards)
+        features = self.features[:n]
+        cells = self.cells
+
+        features[:, MACRO_PLANE:] = 0
+        for i, board in enumerate(boards):
+            cells[i] = board.board
+            _encode_state(board, features[i])
+
+        np.equal(cells[:n], _X, out=self.x_mask[:n])
+        np.copyto(features[:, X_PLANE:O_PLANE], self.x_mask[:n])
+        np.equal(cells[:n], _O, out=self.o_mask[:n])
+        np.copyto(features[:, O_PLANE:MACRO_PLANE], self.o_mask[:n])
+
+    def _forward(self, n: int) -> np.ndarray:
+        """
+        (internal use) Runs the model over the first n rows of the feature buffer.
+        """
+        x = self.features[:n]
+        last = len(self.layers) - 1
+        for i, (weights, _) in enumerate(self.layers):
+            out = self.activations[i][:n]
+            np.matmul(x, weights, out=out)
+            np.add(out, self.biases[i][:n], out=out)
+            if i != last:
+                np.maximum(out, 0, out=out)
+            x = out
+        return x[:, 0]
@@ -0,0 +1,103 @@
+# Unit tests for the evaluation module
+# Should NEVER be imported- run it from the repo root with: python -m engines.evaluation_tests
+
+from game.board import Board
+from engines.evaluation import encode_board, load_weights, save_weights, Evaluator, N_FEATURES, X_PLANE, O_PLANE, MACRO_PLANE, CURRENT_PLANE, TURN_FEATURE
+import os
+import tempfile
+import unittest
+import numpy as np
+
+class TestEvaluation(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.layers = [
+            (rng.normal(size=(N_FEATURES, 16)), rng.normal(size=16)),
+            (rng.normal(size=(16, 1)), rng.normal(size=1))
+        ]
+        # X wins sub-board 0, then O is sent to sub-board 3
+        self.board = Board(np.array([1, 1, 1, 0, 0, 0, 0, 0, 0] + [0] * 27 + [-1, -1, 0, 0, 0, 0, 0, 0, 0] + [0] * 36, np.short), 3)
+
+    def encode(self, board):
+        return encode_board(board, np.zeros(N_FEATURES, np.float32))
+
+    def test_occupancy_planes(self):
+        features = self.encode(self.board)
+        self.assertTrue((features[X_PLANE:X_PLANE + 3] == 1).all())
+        self.assertEqual(features[X_PLANE:O_PLANE].sum(), 3)
+        self.assertTrue((features[O_PLANE + 36:O_PLANE + 38] == 1).all())
+        self.assertEqual(features[O_PLANE:MACRO_PLANE].sum(), 2)
+
+    def test_macro_plane(self):
+        features = self.encode(self.board)
+        macro = features[MACRO_PLANE:CURRENT_PLANE].reshape(9, 4)
+        # Exactly one slot per sub-board
+        self.assertTrue((macro.sum(axis=1) == 1).all())
+        self.assertEqual(macro[0].argmax(), 0) # X won
+        self.assertTrue((macro[1:, 3] == 1).all()) # Everything else open
+
+        drawn = Board(np.array([1, -1, -1, -1, 1, 1, 1, 1, -1] + [-1, -1, -1] + [0] * 69, np.short))
+        macro = self.encode(drawn)[MACRO_PLANE:CURRENT_PLANE].reshape(9, 4)
+        self.assertEqual(macro[0].argmax(), 2)
+        self.assertEqual(macro[1].argmax(), 1)
+
+    def test_current_board_plane(self):
+        features = self.encode(self.board)
+        self.assertEqual(features[CURRENT_PLANE:TURN_FEATURE].sum(), 1)
+        self.assertEqual(features[CURRENT_PLANE + 3], 1)
+
+        features = self.encode(Board())
+        self.assertEqual(features[CURRENT_PLANE:TURN_FEATURE].sum(), 1)
+        self.assertEqual(features[CURRENT_PLANE + 9], 1) # Any board
+
+    def test_turn_feature(self):
+        self.assertEqual(self.encode(self.board)[TURN_FEATURE], 1)
+        self.assertEqual(self.encode(Board())[TURN_FEATURE], 0)
+        self.assertEqual(self.encode(Board().make_move((4, 4)))[TURN_FEATURE], 1)
+
+    def test_weights_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "weights.npz")
+            save_weights(path, self.layers)
+            loaded = load_weights(path)
+        self.assertEqual(len(loaded), 2)
+        for (weights, bias), (loaded_weights, loaded_bias) in zip(self.layers, loaded):
+            self.assertTrue((weights == loaded_weights).all())
+            self.assertTrue((bias == loaded_bias).all())
+
+    def test_bad_layers(self):
+        with self.assertRaises(ValueError):
+            Evaluator([(np.zeros((N_FEATURES - 1, 1)), np.zeros(1))])
+        with self.assertRaises(ValueError):
+            Evaluator([(np.zeros((N_FEATURES, 4)), np.zeros(3)), (np.zeros((4, 1)), np.zeros(1))])
+        with self.assertRaises(ValueError):
+            Evaluator([(np.zeros((N_FEATURES, 4)), np.zeros(4))])
+        with self.assertRaises(ValueError):
+            Evaluator([])
+
+    def test_batch_too_large(self):
+        evaluator = Evaluator(self.layers, max_batch=2)
+        with self.assertRaises(ValueError):
+            evaluator.evaluate([Board(), Board(), Board()])
+
+    def test_batch_matches_single(self):
+        evaluator = Evaluator(self.layers, max_batch=8)
+        boards = [Board(), self.board, Board().make_move((4, 4)), Board().make_move((0, 0)).make_move((0, 4))]
+        batch = np.array(evaluator.evaluate(boards))
+        for board, score in zip(boards, batch):
+            self.assertAlmostEqual(evaluator.evaluate_one(board), score, places=4)
+
+        # The batch encoding has to match encode_board()
+        evaluator.evaluate(boards)
+        for i, board in enumerate(boards):
+            self.assertTrue((evaluator.features[i] == self.encode(board)).all())
+
+    def test_linear(self):
+        evaluator = Evaluator([(np.ones((N_FEATURES, 1)), [0.5])])
+        # 9 open sub-boards + any board
+        self.assertAlmostEqual(evaluator.evaluate_one(Board()), 10.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 from .engine_base import BaseEngine
 from game.board import Board
+from game.time_control import Clock
 
 import random
 import time
@@ -13,7 +14,7 @@ class SampleEngine(BaseEngine):
         # Can be whatever you want
         self.total_boards_evaluated = board_start
     
-    def best_move(self, board: Board, time_limit: float) -> tuple[tuple[int], dict]:
+    def best_move(self, board: Board, time_limit: Clock) -> tuple[tuple[int], dict]:
         """
         Finds the best move from the given board and returns it, along with an optional metadata dict
         """
@@ -1,9 +1,35 @@
-from flask import Flask, render_template, request
-from .game.board import Board, board_from_repr
+import os
+import sys
+
+# The engines import the game package from the repo root (as match.py runs them), so it has to be importable however the app is started
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify, render_template, request
+from game.board import Board, board_from_repr
+from game.time_control import TimeControl
+from engines.engine_base import BaseEngine
+from engines.engine_worker import EngineTimeout, EngineWorker, LIFECYCLE_TIMEOUT
+from engines.sample import SampleEngine
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import atexit
+import threading
 
 app = Flask(__name__)
 game_board = Board()
 
+# Analysis settings
+# The engine used by /analyze, and the input args it's built with
+ANALYSIS_ENGINE: type[BaseEngine] = SampleEngine
+ANALYSIS_ENGINE_ARGS = (0,)
+ANALYSIS_WORKERS = 2
+ANALYSIS_CACHE_SIZE = 1024
+ANALYSIS_DEFAULT_TIME = 5
+ANALYSIS_MAX_TIME = 30
+# How long a request waits for a result before giving up, including time spent queued. The search keeps going and its result is still cached.
+ANALYSIS_REQUEST_TIMEOUT = 120
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -64,5 +90,249 @@ def updateBoard():
     else:
         return "Please provide an input string."
 
+class AnalysisCache():
+    """
+    LRU cache of analysis results, keyed by the position's repr. Each result is tagged with the time and depth it was searched to, so a quick search never stands in for a longer one.
+    """
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _quality(result: dict) -> tuple[int, float]:
+        return (-1 if result['depth'] is None else result['depth'], result['time_limit'])
+
+    @staticmethod
+    def good_enough(result: dict, time_limit: float, depth: int | None = None) -> bool:
+        """
+        Whether a result is as good as a search with the given time limit, or reaching the given depth, would be.
+        Also works on the spec of a search that's still running, whose depth isn't known yet.
+        """
+        if depth is not None and result['depth'] is not None and result['depth'] >= depth:
+            return True
+        # A search capped shallower than what's being asked for can't stand in for it, however long it ran
+        if result['max_depth'] is not None and (depth is None or result['max_depth'] < depth):
+            return False
+        return result['time_limit'] >= time_limit
+
+    def get(self, key: str, time_limit: float, depth: int | None = None) -> dict | None:
+        """
+        Gets the cached result for a position, if there is one that's good enough. Returns None otherwise.
+        """
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None or not self.good_enough(result, time_limit, depth):
+                return None
+            self.entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: dict) -> None:
+        """
+        Caches a result, unless a better one is already cached for the position.
+        """
+        with self.lock:
+            existing = self.entries.get(key)
+            if existing is None or self._quality(result) >= self._quality(existing):
+                self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+class AnalysisService():
+    """
+    Runs analysis searches in a pool of engine worker processes. Results are cached, and requests for a position that's already being searched share that search.
+    """
+    def __init__(self, engine_type: type[BaseEngine], engine_args: tuple = (), workers: int = 2, cache_size: int = 1024) -> None:
+        """
+        Set up an analysis service. The engine isn't built until the first search.
+
+        Args:
+            engine_type (type): The engine class to analyze with.
+            engine_args (tuple, optional): The input args it's built with.
+            workers (int, optional): How many searches can run at once.
+            cache_size (int, optional): How many positions to keep results for.
+        """
+        self.engine_type = engine_type
+        self.engine_args = engine_args
+        self.engine = None
+        self.cache = AnalysisCache(cache_size)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        # Searches that are queued or running, keyed by position, along with the spec they were started with
+        self.pending: dict[str, tuple[Future, dict]] = {}
+        self.pending_lock = threading.Lock()
+        # Each pool thread drives its own worker process, all copied from one engine so setup() only runs once
+        self.workers = []
+        self.worker_state = threading.local()
+        # Workers in the middle of a search. stop() leaves these for their own thread to shut down once the search is done.
+        self.busy: set[EngineWorker] = set()
+        self.stopped = False
+        self.engine_lock = threading.Lock()
+
+    def _claim_worker(self) -> EngineWorker:
+        """
+        (internal use) Gets this thread's worker and marks it busy.
+        """
+        with self.engine_lock:
+            if self.stopped:
+                raise RuntimeError("The analysis service has been stopped")
+            worker = getattr(self.worker_state, 'worker', None)
+            if worker is None:
+                if self.engine is None:
+                    self.engine = self.engine_type(*self.engine_args)
+                    self.engine.setup()
+                worker = EngineWorker(self.engine)
+                self.workers.append(worker)
+                self.worker_state.worker = worker
+            self.busy.add(worker)
+        return worker
+
+    def _release_worker(self, worker: EngineWorker) -> None:
+        """
+        (internal use) Marks a worker as done with its search, shutting it down if stop() was called in the meantime.
+        """
+        with self.engine_lock:
+            self.busy.discard(worker)
+            stopped = self.stopped
+        if stopped:
+            worker.stop()
+
+    def _search(self, board: Board, time_limit: float, depth: int | None) -> dict:
+        """
+        (internal use) Searches a position. Runs inside the pool; the engine's worker is killed if it goes over time_limit.
+        """
+        worker = self._claim_worker()
+        try:
+            worker.call('new_game', 0, timeout=LIFECYCLE_TIMEOUT)
+            clock = TimeControl.per_move(time_limit, time_limit).new_game().clock(board.turn())
+            (move, metadata), time_taken = worker.best_move(board, clock, timeout=time_limit, max_depth=depth)
+        finally:
+            self._release_worker(worker)
+
+        if not board.is_move_legal(move):
+            raise ValueError(f"{worker.name} suggested the illegal move {move}")
+
+        return {
+            'board_repr': repr(board),
+            'best_move': _move_to_list(move),
+            'evaluation': metadata.get('evaluation'),
+            'pv': [_move_to_list(m) for m in metadata.get('pv', [move])],
+            'depth': metadata.get('depth'),
+            'max_depth': depth,
+            'time_limit': time_limit,
+            'time_taken': time_taken,
+            'engine': worker.name
+        }
+
+    def _finish(self, key: str, future: Future) -> None:
+        # Cached before it stops being pending, so there's no window where a new request would start a duplicate search
+        if future.exception() is None:
+            self.cache.put(key, future.result())
+        with self.pending_lock:
+            pending = self.pending.get(key)
+            if pending is not None and pending[0] is future:
+                del self.pending[key]
+
+    def analyze(self, board: Board, time_limit: float, depth: int | None = None, timeout: float | None = None) -> tuple[dict, bool]:
+        """
+        Analyzes a position, using the cache or an already running search where possible.
+
+        Args:
+            board (Board): The position to analyze.
+            time_limit (float): How long the engine can search for.
+            depth (int | None, optional): The depth to search to. Passed to the engine as max_depth, and a cached result that reached it is good enough regardless of its time limit.
+            timeout (float | None, optional): How long to wait for the result. The search keeps going if this runs out, and its result is still cached.
+
+        Returns:
+            type: The analysis result, and whether it came straight from the cache.
+        """
+        key = repr(board)
+        cached = self.cache.get(key, time_limit, depth)
+        if cached is not None:
+            return cached, True
+
+        with self.pending_lock:
+            pending = self.pending.get(key)
+            if pending is not None and AnalysisCache.good_enough(pending[1], time_limit, depth):
+                future = pending[0]
+                new_search = False
+            else:
+                future = self.pool.submit(self._search, board, time_limit, depth)
+                self.pending[key] = (future, {'depth': None, 'max_depth': depth, 'time_limit': time_limit})
+                new_search = True
+        # Registered outside the lock, since it runs immediately if the search has already finished
+        if new_search:
+            future.add_done_callback(lambda f: self._finish(key, f))
+
+        return future.result(timeout=timeout), False
+
+    def stop(self) -> None:
+        """
+        Shuts down every worker and tears the engine down. Doesn't wait for running searches- their workers are shut down as soon as they finish.
+        """
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        with self.engine_lock:
+            self.stopped = True
+            idle = [worker for worker in self.workers if worker not in self.busy]
+        for worker in idle:
+            worker.stop()
+        if self.engine is not None:
+            self.engine.teardown()
+
+def _move_to_list(move) -> list[int]:
+    return [int(move[0]), int(move[1])]
+
+analysis_service = AnalysisService(ANALYSIS_ENGINE, ANALYSIS_ENGINE_ARGS, ANALYSIS_WORKERS, ANALYSIS_CACHE_SIZE)
+atexit.register(lambda: analysis_service.stop())
+
+def _parse_number(name: str, parse):
+    """
+    (internal use) Reads an optional number from the request. Raises ValueError if it's there but doesn't parse.
+    """
+    value = request.values.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return parse(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number. Got {value!r}")
+
+@app.route('/analyze', methods=['GET', 'POST'])
+def analyze():
+    board_repr = request.values.get('board_repr')
+    if not board_repr:
+        return jsonify(error="Please provide a board_repr."), 400
+
+    try:
+        board = board_from_repr(board_repr.strip())
+        time_limit = _parse_number('time', float)
+        depth = _parse_number('depth', int)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if board.winner() != None:
+        return jsonify(error="The game is already over."), 400
+    if next(board.get_legal_moves(), None) is None:
+        return jsonify(error="There are no legal moves in this position."), 400
+
+    if time_limit is None:
+        time_limit = ANALYSIS_DEFAULT_TIME
+    if not 0 < time_limit <= ANALYSIS_MAX_TIME:
+        return jsonify(error=f"time must be between 0 and {ANALYSIS_MAX_TIME} seconds."), 400
+    if depth is not None and depth < 1:
+        return jsonify(error="depth must be at least 1."), 400
+
+    try:
+        result, cached = analysis_service.analyze(board, time_limit, depth, ANALYSIS_REQUEST_TIMEOUT)
+    except EngineTimeout:
+        return jsonify(error=f"The engine didn't finish within {time_limit}s."), 504
+    except TimeoutError:
+        return jsonify(error="Analysis is still running, try again later."), 503
+    except Exception:
+        # The details (e.g. the engine's traceback) are for the server log, not the client
+        app.logger.exception("Analysis of %s failed", board_repr)
+        return jsonify(error="Analysis failed."), 500
+
+    return jsonify(dict(result, cached=cached))
+
 if __name__ == '__main__':
     app.run(debug=True)
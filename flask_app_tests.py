@@ -0,0 +1,199 @@
+# Unit tests for the web app's analysis service
+# Should NEVER be imported, this should purely be run as a standalone script from the repo root
+
+from flask_app import app, AnalysisCache, AnalysisService
+import flask_app
+from flask.cli import ScriptInfo
+from game.board import Board
+from engines.engine_base import BaseEngine
+from engines.engine_worker import EngineTimeout
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+import unittest
+
+class SlowEngine(BaseEngine):
+    def __init__(self) -> None:
+        self.name = "Slow Engine"
+        self.player = "Nobody"
+
+    def best_move(self, board, time_limit):
+        time.sleep(0.3)
+        return next(board.get_legal_moves()), {'evaluation': 0.5, 'depth': self.max_depth}
+
+class CrashingEngine(SlowEngine):
+    def best_move(self, board, time_limit):
+        raise RuntimeError("secret engine internals")
+
+class HangingEngine(SlowEngine):
+    def best_move(self, board, time_limit):
+        while True:
+            time.sleep(1)
+
+def result(time_limit, depth=None, max_depth=None):
+    return {'time_limit': time_limit, 'depth': depth, 'max_depth': max_depth}
+
+class TestAnalysisCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = AnalysisCache(2)
+        cache.put('a', result(1))
+        cache.put('b', result(1))
+        cache.get('a', 1) # 'a' is now the most recently used
+        cache.put('c', result(1))
+        self.assertIsNotNone(cache.get('a', 1))
+        self.assertIsNone(cache.get('b', 1))
+        self.assertIsNotNone(cache.get('c', 1))
+
+    def test_time_quality(self):
+        cache = AnalysisCache(8)
+        cache.put('a', result(2))
+        self.assertIsNotNone(cache.get('a', 1))
+        self.assertIsNotNone(cache.get('a', 2))
+        self.assertIsNone(cache.get('a', 5))
+
+    def test_depth_quality(self):
+        cache = AnalysisCache(8)
+        cache.put('a', result(1, depth=6))
+        # Reached the asked for depth, so the time limit doesn't matter
+        self.assertIsNotNone(cache.get('a', 10, depth=6))
+        self.assertIsNone(cache.get('a', 10, depth=7))
+
+        cache.put('b', result(10, max_depth=3))
+        # Capped too shallow to stand in for a deeper or uncapped search
+        self.assertIsNone(cache.get('b', 1))
+        self.assertIsNone(cache.get('b', 1, depth=4))
+        self.assertIsNotNone(cache.get('b', 1, depth=3))
+
+    def test_keeps_better_result(self):
+        cache = AnalysisCache(8)
+        cache.put('a', result(5))
+        cache.put('a', result(1))
+        self.assertEqual(cache.get('a', 1)['time_limit'], 5)
+
+class TestAnalysisService(unittest.TestCase):
+
+    def setUp(self):
+        self.board = Board().make_move((4, 4))
+
+    def test_shares_duplicate_searches(self):
+        service = AnalysisService(SlowEngine, workers=2)
+        searches = []
+        search = service._search
+        def counting_search(*args):
+            searches.append(args)
+            return search(*args)
+        service._search = counting_search
+
+        try:
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(lambda _: service.analyze(self.board, 1), range(8)))
+            self.assertEqual(len(searches), 1)
+            self.assertTrue(all(r[0] is results[0][0] for r in results))
+
+            # Already cached
+            self.assertTrue(service.analyze(self.board, 1)[1])
+            self.assertEqual(len(searches), 1)
+        finally:
+            service.stop()
+
+    def test_depth_is_passed_to_engine(self):
+        service = AnalysisService(SlowEngine, workers=1)
+        try:
+            analysis, cached = service.analyze(self.board, 1, depth=3)
+            self.assertEqual(analysis['depth'], 3)
+            self.assertTrue(service.analyze(self.board, 1, depth=3)[1])
+            # Capped at 3, so it can't answer for a deeper search
+            analysis, cached = service.analyze(self.board, 1, depth=5)
+            self.assertFalse(cached)
+            self.assertEqual(analysis['depth'], 5)
+        finally:
+            service.stop()
+
+    def test_time_limit_is_enforced(self):
+        service = AnalysisService(HangingEngine, workers=1)
+        try:
+            for _ in range(2):
+                # The hung worker is killed each time, so the second search isn't stuck behind the first
+                start = time.time()
+                with self.assertRaises(EngineTimeout):
+                    service.analyze(self.board, 0.3)
+                self.assertLess(time.time() - start, 2)
+            self.assertIsNone(service.cache.get(repr(self.board), 0.3))
+        finally:
+            service.stop()
+
+    def test_stop_during_search(self):
+        service = AnalysisService(SlowEngine, workers=1)
+        with ThreadPoolExecutor(1) as pool:
+            search = pool.submit(service.analyze, self.board, 1)
+            while not service.busy:
+                time.sleep(0.01)
+            worker = next(iter(service.busy))
+
+            # Doesn't wait on the search, or pull its worker out from under it
+            start = time.time()
+            service.stop()
+            self.assertLess(time.time() - start, 0.2)
+            self.assertEqual(search.result()[0]['best_move'][0], 4)
+        # Shut down by its own thread once the search was done
+        self.assertFalse(worker.alive())
+        with self.assertRaises(RuntimeError):
+            service.analyze(Board(), 1)
+
+class TestAnalyzeEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.board_repr = repr(Board().make_move((4, 4)))
+
+    def test_loads_like_flask_run(self):
+        # The same lookup `flask run` does with FLASK_APP=flask_app
+        loaded = ScriptInfo(app_import_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "flask_app.py")).load_app()
+        self.assertIn('/analyze', [rule.rule for rule in loaded.url_map.iter_rules()])
+
+    def test_analyze(self):
+        response = self.client.post('/analyze', data={'board_repr': self.board_repr, 'time': 1})
+        self.assertEqual(response.status_code, 200)
+        analysis = response.get_json()
+        self.assertEqual(analysis['best_move'][0], 4)
+        self.assertTrue(Board().make_move((4, 4)).is_move_legal(tuple(analysis['best_move'])))
+
+        response = self.client.get('/analyze', query_string={'board_repr': self.board_repr, 'time': 1})
+        self.assertTrue(response.get_json()['cached'])
+
+    def test_bad_input(self):
+        bad_requests = [
+            {},
+            {'board_repr': '1 2 3'},
+            {'board_repr': '0 ' * 81 + '12'},
+            {'board_repr': self.board_repr, 'time': 'abc'},
+            {'board_repr': self.board_repr, 'time': 99},
+            {'board_repr': self.board_repr, 'time': 'nan'},
+            {'board_repr': self.board_repr, 'depth': 'deep'},
+            {'board_repr': self.board_repr, 'depth': 0},
+            # Sent to a full sub-board, so there's nothing to play
+            {'board_repr': '1 -1 1 1 -1 -1 -1 1 1 ' + '0 ' * 72 + '0'},
+        ]
+        for data in bad_requests:
+            response = self.client.post('/analyze', data=data)
+            self.assertEqual(response.status_code, 400, data)
+            self.assertIn('error', response.get_json())
+
+    def test_engine_error_is_not_leaked(self):
+        service = flask_app.analysis_service
+        flask_app.analysis_service = AnalysisService(CrashingEngine, workers=1)
+        try:
+            with self.assertLogs(app.logger, 'ERROR') as logs:
+                response = self.client.post('/analyze', data={'board_repr': self.board_repr, 'time': 1})
+        finally:
+            flask_app.analysis_service.stop()
+            flask_app.analysis_service = service
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn("secret engine internals", response.get_data(as_text=True))
+        self.assertIn("secret engine internals", "\n".join(logs.output))
+
+
+if __name__ == "__main__":
+    unittest.main()
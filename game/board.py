@@ -360,8 +360,17 @@ def board_from_repr(repr_str: str):
     board = np.zeros(81)
     for i in range(81):
         board[i] = int(vals[i])
-    
-    return Board(board, int(vals[-1]))
+        if board[i] not in (-1, 0, 1):
+            raise ValueError(f"Square {i} must be -1, 0, or 1. Got {vals[i]}")
+
+    current_board = int(vals[-1])
+    if current_board < -1 or current_board > 8:
+        raise ValueError(f"Current board must be in the range -1 to 8. Got {current_board}")
+
+    board = Board(board, current_board)
+    if current_board != -1 and not board.subboard_open(current_board):
+        raise ValueError(f"Current board {current_board} is already finished, so it can't be played on")
+    return board
 
 if __name__ == "__main__":
     board = Board()
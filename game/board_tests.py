@@ -1,7 +1,7 @@
 # This is where unit tests for the board go
 # Should NEVER be imported, this should purely be run as a standalone script to make sure the board is working properly
 
-from board import Board
+from board import Board, board_from_repr
 import unittest
 import numpy as np
 
@@ -91,6 +91,23 @@ class TestBoard(unittest.TestCase):
     def test_repr(self):
         # Default board representation
         self.assertEqual(self.default_board.__repr__(), '0 '*81 + '-1')
+
+    def test_from_repr(self):
+        board = board_from_repr(repr(Board().make_move((4, 4))))
+        self.assertEqual(board.current_board, 4)
+        self.assertEqual(board.board[40], 1)
+
+        with self.assertRaises(ValueError):
+            board_from_repr('0 ' * 81 + '12')
+        with self.assertRaises(ValueError):
+            board_from_repr('2 ' + '0 ' * 80 + '-1')
+        with self.assertRaises(ValueError):
+            board_from_repr('0 ' * 40)
+        # Sent to a sub-board that's already been won, or filled up
+        with self.assertRaises(ValueError):
+            board_from_repr('1 1 1 ' + '0 ' * 78 + '0')
+        with self.assertRaises(ValueError):
+            board_from_repr('1 -1 1 1 -1 -1 -1 1 1 ' + '0 ' * 72 + '0')
     
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+# How many more moves an engine is assumed to need when it has a bank of time instead of a per-move limit.
+# Only used to suggest a budget for engines that treat the clock as a plain number.
+EXPECTED_MOVES_LEFT = 20
+
+class Clock(float):
+    """
+    What an engine is given to budget its time with. Behaves as a float equal to the suggested time for this move, so engines written for a plain time limit keep working.
+    """
+    __slots__ = ("remaining", "opponent_remaining", "increment", "move_limit", "moves_played")
+    def __new__(cls, budget: float, remaining: float | None, opponent_remaining: float | None, increment: float, move_limit: float | None, moves_played: int):
+        """
+        Args:
+            budget (float): The suggested time to spend on this move.
+            remaining (float | None): Time left on this engine's clock, or None if there's no bank of time (per-move limits only).
+            opponent_remaining (float | None): Time left on the opponent's clock, or None if there's no bank of time.
+            increment (float): Time added to the clock after each move.
+            move_limit (float | None): The soft limit for this move, or None if there isn't one.
+            moves_played (int): How many moves this engine has already made this game.
+        """
+        clock = super().__new__(cls, budget)
+        clock.remaining = remaining
+        clock.opponent_remaining = opponent_remaining
+        clock.increment = increment
+        clock.move_limit = move_limit
+        clock.moves_played = moves_played
+        return clock
+
+    def __reduce__(self):
+        # float's default only passes the value along, which would lose the rest of the clock when pickled or copied
+        return (Clock, (float(self), self.remaining, self.opponent_remaining, self.increment, self.move_limit, self.moves_played))
+
+    def __repr__(self) -> str:
+        return f"Clock({float(self)}, remaining={self.remaining}, opponent_remaining={self.opponent_remaining}, increment={self.increment}, move_limit={self.move_limit})"
+
+class TimeControl():
+    """
+    The time rules for a game. Holds no per-game state- call new_game() to get a GameClock for each game.
+    """
+    __slots__ = ("soft_limit", "hard_limit", "base_time", "increment", "overrun_bonus")
+    def __init__(self, soft_limit: float | None = None, hard_limit: float | None = None, base_time: float | None = None, increment: float = 0, overrun_bonus: float = 1.5) -> None:
+        """
+        Set up a time control. Per-move limits and a bank of time can be combined.
+
+        Args:
+            soft_limit (float | None, optional): Per-move soft limit. Going over it grants the time exceeded to the opponent, multiplied by overrun_bonus.
+            hard_limit (float | None, optional): Per-move hard limit. Going over it forfeits the game.
+            base_time (float | None, optional): Each player's starting bank of time. Running out forfeits the game. None for no bank.
+            increment (float, optional): Time added to a player's bank after each of their moves.
+            overrun_bonus (float, optional): Multiplier on soft limit overruns granted to the opponent.
+
+        Examples:
+            >>> TimeControl.per_move(90, 100)
+            Output: The classic tournament rules.
+            >>> TimeControl.fischer(300, 5)
+            Output: 5 minutes each, plus 5s per move.
+        """
+        if soft_limit is None and hard_limit is None and base_time is None:
+            raise ValueError("A time control needs a per-move limit, a bank of time, or both.")
+        if soft_limit is not None and hard_limit is not None and hard_limit < soft_limit:
+            raise ValueError(f"Hard limit ({hard_limit}) can't be below the soft limit ({soft_limit})")
+
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.base_time = base_time
+        self.increment = increment
+        self.overrun_bonus = overrun_bonus
+
+    @staticmethod
+    def per_move(soft_limit: float, hard_limit: float, overrun_bonus: float = 1.5) -> "TimeControl":
+        """
+        A fixed time limit for every move.
+        """
+        return TimeControl(soft_limit=soft_limit, hard_limit=hard_limit, overrun_bonus=overrun_bonus)
+
+    @staticmethod
+    def sudden_death(base_time: float) -> "TimeControl":
+        """
+        A single bank of time for the whole game.
+        """
+        return TimeControl(base_time=base_time)
+
+    @staticmethod
+    def fischer(base_time: float, increment: float) -> "TimeControl":
+        """
+        A bank of time for the whole game, with time added after every move.
+        """
+        return TimeControl(base_time=base_time, increment=increment)
+
+    def scaled(self, factor: float) -> "TimeControl":
+        """
+        Makes a copy of this time control with every time multiplied by factor.
+        """
+        def scale(t):
+            return None if t is None else t * factor
+        return TimeControl(scale(self.soft_limit), scale(self.hard_limit), scale(self.base_time), self.increment * factor, self.overrun_bonus)
+
+    def new_game(self) -> "GameClock":
+        """
+        Makes a fresh clock for a single game.
+        """
+        return GameClock(self)
+
+    def __repr__(self) -> str:
+        return f"TimeControl(soft_limit={self.soft_limit}, hard_limit={self.hard_limit}, base_time={self.base_time}, increment={self.increment})"
+
+class GameClock():
+    """
+    The clock for a single game. Tracks both players' remaining time and any soft limit bonus owed to the player to move.
+    """
+    __slots__ = ("control", "remaining", "bonus", "moves_played")
+    def __init__(self, control: TimeControl) -> None:
+        self.control = control
+        # Indexed by Board.turn(); 0 for X, 1 for O
+        self.remaining = [control.base_time, control.base_time]
+        self.moves_played = [0, 0]
+        # Bonus for the next player to move only, earned from the opponent going over the soft limit
+        self.bonus = 0
+
+    def soft_limit(self, turn: int) -> float | None:
+        """
+        The soft limit for the player's next move, including any bonus time. None if there's no per-move soft limit.
+        """
+        if self.control.soft_limit is None:
+            return None
+        return self.control.soft_limit + self.bonus
+
+    def hard_limit(self, turn: int) -> float:
+        """
+        The longest the player can take on their next move without forfeiting.
+        """
+        limits = []
+        if self.control.hard_limit is not None:
+            limits.append(self.control.hard_limit + self.bonus)
+        if self.remaining[turn] is not None:
+            limits.append(self.remaining[turn])
+        if not limits:
+            # Soft limit only; nothing to forfeit on
+            return float('inf')
+        return min(limits)
+
+    def clock(self, turn: int) -> Clock:
+        """
+        Makes the Clock handed to the engine for its next move.
+
+        Args:
+            turn (int): The player to move, as given by Board.turn().
+        """
+        soft = self.soft_limit(turn)
+        remaining = self.remaining[turn]
+
+        if remaining is None:
+            budget = soft if soft is not None else self.hard_limit(turn)
+        else:
+            budget = min(remaining, remaining / EXPECTED_MOVES_LEFT + self.control.increment)
+            if soft is not None:
+                budget = min(budget, soft)
+
+        return Clock(budget, remaining, self.remaining[1 - turn], self.control.increment, soft, self.moves_played[turn])
+
+    def record(self, turn: int, time_taken: float) -> float:
+        """
+        Charges a move to the player's clock. Check the move against hard_limit() first- this doesn't handle forfeits.
+
+        Args:
+            turn (int): The player that moved, as given by Board.turn() before the move.
+            time_taken (float): How long the move took.
+
+        Returns:
+            type: The bonus time granted to the opponent for going over the soft limit. 0 if the soft limit wasn't exceeded.
+        """
+        soft = self.soft_limit(turn)
+
+        if self.remaining[turn] is not None:
+            self.remaining[turn] -= time_taken
+            self.remaining[turn] += self.control.increment
+        self.moves_played[turn] += 1
+
+        if soft is not None and time_taken > soft:
+            self.bonus = self.control.overrun_bonus * (time_taken - soft)
+        else:
+            self.bonus = 0
+        return self.bonus
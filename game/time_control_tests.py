@@ -0,0 +1,76 @@
+# Unit tests for the time controls
+# Should NEVER be imported, this should purely be run as a standalone script
+
+from time_control import Clock, TimeControl
+import copy
+import pickle
+import unittest
+
+class TestTimeControl(unittest.TestCase):
+
+    def test_clock_is_float(self):
+        clock = Clock(5, 100, 80, 2, None, 0)
+        self.assertEqual(clock * 2, 10)
+        self.assertEqual(clock.remaining, 100)
+        self.assertEqual(clock.opponent_remaining, 80)
+
+    def test_clock_round_trip(self):
+        clock = Clock(5, 100, 80, 2, 7.5, 3)
+        for copied in [pickle.loads(pickle.dumps(clock)), copy.copy(clock), copy.deepcopy(clock)]:
+            self.assertIsInstance(copied, Clock)
+            self.assertEqual(copied, 5)
+            self.assertEqual(copied.remaining, 100)
+            self.assertEqual(copied.opponent_remaining, 80)
+            self.assertEqual(copied.increment, 2)
+            self.assertEqual(copied.move_limit, 7.5)
+            self.assertEqual(copied.moves_played, 3)
+
+    def test_per_move(self):
+        clock = TimeControl.per_move(90, 100).new_game()
+        self.assertEqual(clock.clock(0), 90)
+        self.assertIsNone(clock.clock(0).remaining)
+        self.assertEqual(clock.hard_limit(0), 100)
+
+    def test_soft_limit_bonus(self):
+        clock = TimeControl.per_move(90, 100).new_game()
+        self.assertEqual(clock.record(0, 92), 3)
+        # Bonus only goes to the next move
+        self.assertEqual(clock.soft_limit(1), 93)
+        self.assertEqual(clock.hard_limit(1), 103)
+        self.assertEqual(clock.record(1, 10), 0)
+        self.assertEqual(clock.soft_limit(0), 90)
+
+    def test_sudden_death(self):
+        clock = TimeControl.sudden_death(60).new_game()
+        clock.record(0, 20)
+        self.assertEqual(clock.hard_limit(0), 40)
+        self.assertEqual(clock.clock(1).opponent_remaining, 40)
+        self.assertEqual(clock.clock(1).remaining, 60)
+
+    def test_fischer(self):
+        clock = TimeControl.fischer(60, 5).new_game()
+        clock.record(0, 20)
+        self.assertEqual(clock.remaining[0], 45)
+        self.assertEqual(clock.clock(0).increment, 5)
+        self.assertLessEqual(clock.clock(0), 45)
+
+    def test_games_are_independent(self):
+        control = TimeControl.sudden_death(60)
+        first = control.new_game()
+        first.record(0, 30)
+        self.assertEqual(control.new_game().remaining[0], 60)
+
+    def test_scaled(self):
+        control = TimeControl.per_move(90, 100).scaled(0.5)
+        self.assertEqual(control.soft_limit, 45)
+        self.assertEqual(control.hard_limit, 50)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            TimeControl()
+        with self.assertRaises(ValueError):
+            TimeControl.per_move(100, 90)
+
+
+if __name__ == "__main__":
+    unittest.main()
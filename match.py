@@ -1,25 +1,44 @@
 from game.board import Board
+from game.time_control import Clock, TimeControl
 
 from engines.engine_base import BaseEngine
+from engines.engine_worker import EngineCrashed, EngineTimeout, EngineWorker, LIFECYCLE_TIMEOUT
 from engines.sample import SampleEngine as Player1
 from engines.secret import SecretEngine as Player2
 
+import asyncio
+import atexit
+import math
+import os
 import time
 import requests
 import sys
 import traceback
+from concurrent.futures import Executor
 
 # Some limits on how long an engine can think for.
 # Most engines should stop by the soft limit, going beyond the hard limit forfeits the game
 TIME_SOFT_LIMIT = 90
 TIME_HARD_LIMIT = 100
 
+def time_control_for(game_num: int) -> TimeControl:
+    """
+    The time control for a given game of the match. From game 6 onwards, every game gets 15% less time than the one before it.
+    """
+    if game_num <= 5:
+        return TimeControl.per_move(TIME_SOFT_LIMIT, TIME_HARD_LIMIT)
+    soft_limit = TIME_SOFT_LIMIT * (0.85 ** (game_num - 5))
+    return TimeControl.per_move(soft_limit, soft_limit + 10)
+
+# How long to wait on the web UI before giving up on an update
+SEND_BOARD_TIMEOUT = 2
+
 def send_board(input_string):    
     endpoint_url = 'http://localhost:5000/update_board'  # Replace with the actual endpoint URL
     data = {'board_repr': input_string}
 
     try:
-        response = requests.post(endpoint_url, data=data)
+        response = requests.post(endpoint_url, data=data, timeout=SEND_BOARD_TIMEOUT)
         if response.status_code == 200:
             return response.text
         else:
@@ -27,18 +46,12 @@ def send_board(input_string):
     except requests.exceptions.RequestException as e:
         return f"Error: {e}"
 
-def run_game(p1: BaseEngine, p2: BaseEngine, game_num: int = -1, update_site: bool = True) -> int:
-    global TIME_SOFT_LIMIT, TIME_HARD_LIMIT
+def run_game(p1: BaseEngine, p2: BaseEngine, game_num: int = -1, update_site: bool = True, time_control: TimeControl | None = None) -> int:
+    if time_control is None:
+        time_control = time_control_for(game_num)
 
     board = Board()
-
-    bonus_time = 0
-
-    # Didn't feel like writing this every time
-    def soft_limit():
-        return TIME_SOFT_LIMIT + bonus_time
-    def hard_limit():
-        return TIME_HARD_LIMIT + bonus_time
+    clock = time_control.new_game()
 
     while board.winner() == None:
         symbol = 'X' if board.turn() == 0 else 'O'
@@ -47,35 +60,163 @@ def run_game(p1: BaseEngine, p2: BaseEngine, game_num: int = -1, update_site: bo
         # X; Player 1
         print(f"[Game {game_num}]: {current_player.name} ({symbol}) is thinking...")
         
+        turn = board.turn()
         board_copy = board.copy() # Done before timer starts to reduce overhead
+        engine_clock = clock.clock(turn)
+        hard_limit = clock.hard_limit(turn)
         try:
             start = time.time()
-            move = current_player.best_move(board_copy, soft_limit())
+            move = current_player.best_move(board_copy, engine_clock)
             time_taken = time.time() - start
 
             board.make_move(move[0]) # In case the player plays an illegal move
         except Exception:
             print(f"[Game {game_num}]: {current_player.name} ({symbol}) has crashed with the following error:")
             traceback.print_exc()
-            return -1 if board.turn() == 1 else 1
+            return 1 if turn == 1 else -1
         print(f"[Game {game_num}]: {current_player.name} ({symbol}) has decided on the move {move} in {time_taken}s")
 
-        if time_taken > hard_limit():
-            print(f"[Game {game_num}]: {current_player.name} ({symbol}) took too long ({time_taken} > {hard_limit()}) and has lost the game.")
-            return board.turn() * -1
-        elif time_taken > soft_limit():
-            bonus_time = 1.5 * (time_taken - soft_limit())
-            print(f"[Game {game_num}]: {current_player.name} ({symbol}) exceeded the soft time limit ({time_taken} > {soft_limit()}); {bonus_time}s awarded to opponent.")
-        else:
-            bonus_time = 0
+        if time_taken > hard_limit:
+            print(f"[Game {game_num}]: {current_player.name} ({symbol}) took too long ({time_taken} > {hard_limit}) and has lost the game.")
+            return 1 if turn == 1 else -1
+        soft_limit = clock.soft_limit(turn)
+        bonus_time = clock.record(turn, time_taken)
+        if bonus_time > 0:
+            print(f"[Game {game_num}]: {current_player.name} ({symbol}) exceeded the soft time limit ({time_taken} > {soft_limit}); {bonus_time}s awarded to opponent.")
         
         print(board)
         if update_site:
             send_board(repr(board))
 
-    if game_num >= 5:
-        TIME_SOFT_LIMIT *= 0.85
-        TIME_HARD_LIMIT = TIME_SOFT_LIMIT + 10
+    winner = p1 if board.turn() == 1 else p2 # Inverted since the turn will rollover regardless of victory
+    victory_status = board.winner()
+
+    if victory_status == 0:
+        print(f"[Game {game_num}]: Game has ended in a draw.")
+    else:
+        print(f"[Game {game_num}]: {winner.name} ({winner.player}) has won Game {game_num}")
+
+    return board.winner()
+
+def _timed_best_move(engine: BaseEngine, board: Board, time_limit: Clock) -> tuple[tuple[tuple[int], dict], float]:
+    """
+    (internal use) Runs an engine's best_move() and times it. Runs inside the executor, so time spent waiting for a free thread isn't counted against the engine.
+    """
+    start = time.time()
+    move = engine.best_move(board, time_limit)
+    return move, time.time() - start
+
+# Keeps the UI senders referenced until they finish, since the event loop only holds weak references to tasks
+_ui_senders: set[asyncio.Task] = set()
+
+async def _send_boards(updates: asyncio.Queue) -> None:
+    """
+    (internal use) Sends a game's boards to the web UI one at a time, so they arrive in the order they were played. Stops at None.
+    """
+    done = False
+    while not done:
+        boards = [await updates.get()]
+        while not updates.empty():
+            boards.append(updates.get_nowait())
+        if boards[-1] is None:
+            done = True
+            boards.pop()
+        # Only the latest board matters if the server has fallen behind
+        if boards:
+            await asyncio.to_thread(send_board, boards[-1])
+
+async def run_game_async(p1: BaseEngine | EngineWorker, p2: BaseEngine | EngineWorker, game_num: int = -1, update_site: bool = True, executor: Executor | None = None, time_control: TimeControl | None = None) -> int:
+    """
+    Asyncio version of run_game(). Engines think in their own worker processes so several games can be run at once from a single event loop.
+
+    Args:
+        p1 (BaseEngine | EngineWorker): The engine playing X. Plain engines get a worker process for just this game.
+        p2 (BaseEngine | EngineWorker): The engine playing O.
+        game_num (int, optional): The game number, used for logging.
+        update_site (bool, optional): Whether to send the board to the web UI after each move. Updates are sent in the background and never hold up the game.
+        executor (Executor | None, optional): If given, plain engines are called through it instead of in a worker process. Threads can't be stopped, so an engine that goes over the hard limit keeps running in the background.
+        time_control (TimeControl | None, optional): The time rules for the game. Defaults to time_control_for(game_num).
+
+    Returns:
+        type: 1 if X wins, -1 if O wins, and 0 if it is a Draw.
+    """
+    if time_control is None:
+        time_control = time_control_for(game_num)
+
+    owned_workers = []
+    if executor is None:
+        if not isinstance(p1, EngineWorker):
+            p1 = EngineWorker(p1)
+            owned_workers.append(p1)
+        if not isinstance(p2, EngineWorker):
+            p2 = EngineWorker(p2)
+            owned_workers.append(p2)
+
+    ui_updates = None
+    if update_site:
+        # One sender per game, so a slow server never holds up the game and boards can't overtake each other
+        ui_updates = asyncio.Queue()
+        sender = asyncio.ensure_future(_send_boards(ui_updates))
+        _ui_senders.add(sender)
+        sender.add_done_callback(_ui_senders.discard)
+
+    try:
+        return await _play_game_async(p1, p2, game_num, ui_updates, executor, time_control)
+    finally:
+        if ui_updates is not None:
+            # The sender finishes whatever is queued on its own; the result doesn't wait for it
+            ui_updates.put_nowait(None)
+        await asyncio.gather(*[worker.stop_async() for worker in owned_workers])
+
+async def _play_game_async(p1: BaseEngine | EngineWorker, p2: BaseEngine | EngineWorker, game_num: int, ui_updates: asyncio.Queue | None, executor: Executor | None, time_control: TimeControl) -> int:
+    """
+    (internal use) The game loop behind run_game_async(). Each board is queued on ui_updates for the web UI, if given.
+    """
+    loop = asyncio.get_running_loop()
+    board = Board()
+    clock = time_control.new_game()
+
+    while board.winner() == None:
+        symbol = 'X' if board.turn() == 0 else 'O'
+        current_player = p1 if board.turn() == 0 else p2
+
+        print(f"[Game {game_num}]: {current_player.name} ({symbol}) is thinking...")
+
+        turn = board.turn()
+        board_copy = board.copy()
+        engine_clock = clock.clock(turn)
+        hard_limit = clock.hard_limit(turn)
+        try:
+            # The hard limit is enforced as soon as it's hit rather than after the engine returns
+            if isinstance(current_player, EngineWorker):
+                move, time_taken = await current_player.best_move_async(board_copy, engine_clock, timeout=hard_limit)
+            else:
+                move, time_taken = await asyncio.wait_for(
+                    loop.run_in_executor(executor, _timed_best_move, current_player, board_copy, engine_clock),
+                    timeout=None if math.isinf(hard_limit) else hard_limit
+                )
+
+            board.make_move(move[0])
+        except (EngineTimeout, asyncio.TimeoutError):
+            print(f"[Game {game_num}]: {current_player.name} ({symbol}) took too long (> {hard_limit}) and has lost the game.")
+            return 1 if turn == 1 else -1
+        except Exception:
+            print(f"[Game {game_num}]: {current_player.name} ({symbol}) has crashed with the following error:")
+            traceback.print_exc()
+            return 1 if turn == 1 else -1
+        print(f"[Game {game_num}]: {current_player.name} ({symbol}) has decided on the move {move} in {time_taken}s")
+
+        if time_taken > hard_limit:
+            print(f"[Game {game_num}]: {current_player.name} ({symbol}) took too long ({time_taken} > {hard_limit}) and has lost the game.")
+            return 1 if turn == 1 else -1
+        soft_limit = clock.soft_limit(turn)
+        bonus_time = clock.record(turn, time_taken)
+        if bonus_time > 0:
+            print(f"[Game {game_num}]: {current_player.name} ({symbol}) exceeded the soft time limit ({time_taken} > {soft_limit}); {bonus_time}s awarded to opponent.")
+
+        print(board)
+        if ui_updates is not None:
+            ui_updates.put_nowait(repr(board))
 
     winner = p1 if board.turn() == 1 else p2 # Inverted since the turn will rollover regardless of victory
     victory_status = board.winner()
@@ -87,21 +228,140 @@ def run_game(p1: BaseEngine, p2: BaseEngine, game_num: int = -1, update_site: bo
 
     return board.winner()
 
-# Creates a new 
-def getPlayer1(game_num) -> BaseEngine:
-    engine = Player1(0) # Any input args provided by player    
-    #engine.name += " (X)" # temp- just to differentiate
+async def run_games_async(games: list[tuple[BaseEngine, BaseEngine, int]], update_site: bool = True, concurrency: int | None = None, executor: Executor | None = None) -> list[int]:
+    """
+    Runs several games concurrently. Either way, each engine's new_game() is called with the game number before every game it plays.
+
+    Args:
+        games (list): A list of (X engine, O engine, game number) tuples. The engines should already be set up.
+        update_site (bool, optional): Whether to send boards to the web UI.
+        concurrency (int | None, optional): The most games played at once. Defaults to the number of CPUs, so every engine that's thinking gets a core to itself.
+        executor (Executor | None, optional): If given, engines are called through it directly instead of in worker processes, and each game needs its own engine instances. See run_game_async().
+
+    Returns:
+        type: The result of each game, in the same order as the games were given.
+    """
+    if concurrency is None:
+        concurrency = os.cpu_count() or 1
+    concurrency = max(1, min(concurrency, len(games)))
+    running = asyncio.Semaphore(concurrency)
+
+    if executor is not None:
+        loop = asyncio.get_running_loop()
+        async def play(p1, p2, game_num):
+            async with running:
+                for side, engine in ((1, p1), (-1, p2)):
+                    try:
+                        await loop.run_in_executor(executor, engine.new_game, game_num)
+                    except Exception:
+                        print(f"[Game {game_num}]: {engine.name} couldn't start a new game and has lost the game:\n{traceback.format_exc()}")
+                        return -side
+                return await run_game_async(p1, p2, game_num, update_site, executor)
+        return await asyncio.gather(*[play(p1, p2, game_num) for p1, p2, game_num in games])
+
+    # Each engine gets a pool of worker processes, which are reused between games so engine state carries over like it would in a single process
+    # Workers are copied from the engine as it is now, so anything done in setup() is only paid for once
+    pools: dict[int, asyncio.Queue] = {}
+    workers = []
+    for p1, p2, _ in games:
+        for engine in (p1, p2):
+            if id(engine) not in pools:
+                pools[id(engine)] = asyncio.Queue()
+                # An engine playing itself needs a worker for both sides of every game
+                for _ in range(concurrency * (2 if p1 is p2 else 1)):
+                    worker = EngineWorker(engine)
+                    pools[id(engine)].put_nowait(worker)
+                    workers.append(worker)
+
+    async def play(p1, p2, game_num):
+        async with running:
+            w1 = await pools[id(p1)].get()
+            w2 = await pools[id(p2)].get()
+            try:
+                for side, worker in ((1, w1), (-1, w2)):
+                    try:
+                        await worker.call_async('new_game', game_num, timeout=LIFECYCLE_TIMEOUT)
+                    except (EngineTimeout, EngineCrashed) as e:
+                        print(f"[Game {game_num}]: {worker.name} couldn't start a new game and has lost the game:\n{e}")
+                        return -side
+                return await run_game_async(w1, w2, game_num, update_site)
+            finally:
+                # A worker killed for going over time is restarted from the engine the next time it's used
+                pools[id(p1)].put_nowait(w1)
+                pools[id(p2)].put_nowait(w2)
+
+    try:
+        return await asyncio.gather(*[play(p1, p2, game_num) for p1, p2, game_num in games])
+    finally:
+        await asyncio.gather(*[worker.stop_async() for worker in workers])
+
+# Each player's engine is built and set up once per match, then reused for every game
+# Concurrent games don't share it directly- run_games_async() copies it into worker processes, so setup() still only runs once
+_engines: dict[int, BaseEngine] = {}
+_engine_names: dict[int, str] = {}
+
+def _build_engine(player: int) -> BaseEngine:
+    if player == 1:
+        return Player1(0) # Any input args provided by player
+    return Player2(0) # Any input args provided by player
+
+def match_engine(player: int) -> BaseEngine:
+    """
+    Gets a player's engine for this match, building it and calling setup() the first time.
+
+    Args:
+        player (int): 1 or 2.
+    """
+    engine = _engines.get(player)
+    if engine is None:
+        engine = _build_engine(player)
+        engine.setup()
+        _engines[player] = engine
     return engine
-def getPlayer2(game_num) -> BaseEngine:
-    engine = Player2(game_num) # Any input args provided by player    
-    #engine.name += " (O)" # temp- just to differentiate
+
+def get_engine(player: int, game_num: int) -> BaseEngine:
+    """
+    Gets a player's engine, ready to play a new game.
+
+    Args:
+        player (int): 1 or 2.
+        game_num (int): The game about to be played. Passed to the engine's new_game() as the seed.
+    """
+    engine = match_engine(player)
+    engine.new_game(game_num)
     return engine
 
+def getPlayer1(game_num: int) -> BaseEngine:
+    return get_engine(1, game_num)
+def getPlayer2(game_num: int) -> BaseEngine:
+    return get_engine(2, game_num)
+
+def player_name(player: int) -> str:
+    """
+    The display name of a player's engine, e.g. "Sample Engine (Kamil*)". Cached after the first call.
+    """
+    if player not in _engine_names:
+        engine = match_engine(player)
+        _engine_names[player] = f"{engine.name} ({engine.player})"
+    return _engine_names[player]
+
+def teardown_engines():
+    """
+    Calls teardown() on every engine built during the match. Copies running in worker processes are torn down by run_games_async().
+    """
+    for engine in _engines.values():
+        engine.teardown()
+    _engines.clear()
+
 if __name__ == "__main__":    
     UPDATE_SITE = True
     if '-q' in sys.argv or '--quiet' in sys.argv:
         UPDATE_SITE = False
+    RUN_ASYNC = False
+    if '-a' in sys.argv or '--async' in sys.argv:
+        RUN_ASYNC = True
 
+    atexit.register(teardown_engines)
 
     points = {
         1: 0,
@@ -116,13 +376,7 @@ if __name__ == "__main__":
             points[1] += 0.5
             points[-1] += 0.5
 
-        p1 = getPlayer1(total_games)
-        p2 = getPlayer2(total_games)
-
-        p1 = f"{p1.name} ({p1.player})"
-        p2 = f"{p2.name} ({p2.player})"
-
-        print(f"Scoreboard:\n - {p1}: {points[1]}\n - {p2}: {points[-1]}")
+        print(f"Scoreboard:\n - {player_name(1)}: {points[1]}\n - {player_name(2)}: {points[-1]}")
 
     def run_game_pair():
         global total_games
@@ -134,44 +388,53 @@ if __name__ == "__main__":
         total_games += 1
         update_points(game2, True)
 
+    def run_game_pairs(count: int):
+        global total_games
+        if not RUN_ASYNC:
+            for _ in range(count):
+                run_game_pair()
+            return
+
+        # Games in the batch are played concurrently, one per CPU; points are tallied afterwards in game order
+        # new_game() is called on each worker's copy of the engine by run_games_async()
+        player1 = match_engine(1)
+        player2 = match_engine(2)
+        games = []
+        for _ in range(count):
+            games.append((player1, player2, total_games))
+            games.append((player2, player1, total_games + 1))
+            total_games += 2
+
+        results = asyncio.run(run_games_async(games, UPDATE_SITE))
+        for i, result in enumerate(results):
+            update_points(result, i % 2 == 1)
+
     def point_diff():
         return abs(points[1] - points[-1])
     
-    for _ in range(5): # 10 games
-        run_game_pair()
+    run_game_pairs(5) # 10 games
 
     if point_diff() >= 2:        
-        if points[1] > points[-1]:
-            player = getPlayer1(total_games)
-        else:
-            player = getPlayer2(total_games)
-        print(f"[Master]: {player.name} ({player.player}) has won!")
+        winner = 1 if points[1] > points[-1] else 2
+        print(f"[Master]: {player_name(winner)} has won!")
         exit()
     else:
         print("--- Entering Phase 2; 1 pt tolerance ---")
 
-    for _ in range(5): # 10 games
-        run_game_pair()
+    run_game_pairs(5) # 10 games
 
     if point_diff() >= 1:        
-        if points[1] > points[-1]:
-            player = getPlayer1(total_games)
-        else:
-            player = getPlayer2(total_games)
-        print(f"[Master]: {player.name} ({player.player}) has won!")
+        winner = 1 if points[1] > points[-1] else 2
+        print(f"[Master]: {player_name(winner)} has won!")
         exit()
     else:
         print("--- Entering Phase 3; Time Trouble ---")
     
-    for _ in range(5): # 10 games
-        run_game_pair()
+    run_game_pairs(5) # 10 games
     
     if point_diff() >= 1:        
-        if points[1] > points[-1]:
-            player = getPlayer1(total_games)
-        else:
-            player = getPlayer2(total_games)
-        print(f"[Master]: {player.name} ({player.player}) has won!")
+        winner = 1 if points[1] > points[-1] else 2
+        print(f"[Master]: {player_name(winner)} has won!")
         exit()
     else:
         print(f"[Master]: The match is a draw! Figure out what to do")
\ No newline at end of file